@@ -10,10 +10,18 @@ Versão: 3.0 - Suporte universal para diferentes formatos
 """
 
 import argparse
+import mmap
 import re
 import os
+import shutil
+import stat
+import tempfile
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
-from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from multiprocessing import Pool
 
 # Carrega variáveis de ambiente se arquivo .env existir
 try:
@@ -34,6 +42,39 @@ except ImportError:
     class Style:
         BRIGHT = RESET_ALL = ""
 
+# Hyperscan (opcional, Linux/x86) acelera a busca dos schemas de sistema
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Número de queries acumuladas antes de cada escrita no arquivo de saída
+WRITE_CHUNK_SIZE = 10000
+
+# Buffer do arquivo de saída (aberto em modo binário)
+OUTPUT_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Folga (em bytes) no espaço reservado para o cabeçalho, que só recebe os
+# contadores e a data definitivos no fim da extração
+HEADER_SLACK = 256
+
+# Logs a partir deste tamanho são processados em paralelo, em trechos de
+# PARALLEL_CHUNK_SIZE bytes (trechos pequenos limitam a memória dos resultados)
+PARALLEL_MIN_SIZE = 64 * 1024 * 1024
+PARALLEL_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Trechos em andamento por processo: limita os resultados acumulados no
+# processo principal quando a gravação fica para trás
+PARALLEL_PENDING_PER_JOB = 2
+
+# Tamanho dos blocos lidos quando o log não pode ser mapeado em memória
+STREAM_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Cache de classificação: número de entradas e tamanho máximo da query
+CLASSIFY_CACHE_SIZE = 65536
+CLASSIFY_CACHE_MAX_LEN = 512
+
 def print_colored(text, color=None):
     """Imprime texto colorido se colorama estiver disponível"""
     if COLORS_AVAILABLE and color:
@@ -41,101 +82,310 @@ def print_colored(text, color=None):
     else:
         print(text)
 
-def detect_log_format(log_file):
+# Linha de Query característica de cada formato, em uma única regex: o grupo
+# que casar indica o formato
+_FORMAT_PATTERN = re.compile(
+    # Formato Simples: ID ESPAÇO Query [TAB/ESPAÇOS] SQL
+    rb'^\s*(?:(?P<simple>\d+\s+Query\s)'
+    # Formato MariaDB 10.11: YYMMDD HH:MM:SS
+    rb'|(?P<mariadb>\d{6}\s+\d{2}:\d{2}:\d{2}\s+\d+\s+Query)'
+    # Formato MySQL 8.0+ (ISO timestamp) e 5.7 (timestamp simplificado)
+    rb'|(?P<mysql>\d{4}-\d{2}-\d{2}(?:T\d{2}:\d{2}:\d{2}\.\d+Z|\s+\d{2}:\d{2}:\d{2})\s+\d+\s+Query))',
+    re.MULTILINE
+)
+
+def detect_log_format(head):
     """
     Detecta automaticamente o formato do log (MySQL, MariaDB ou Simples)
     
+    Args:
+        head: Início do log em bytes (ou o mmap do log inteiro)
+        
     Returns:
         str: 'mysql', 'mariadb' ou 'simple'
     """
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        for i, line in enumerate(f):
-            if i > 20:  # Verifica apenas as primeiras 20 linhas
-                break
-            
-            line = line.strip()
-            
-            # Formato Simples: ID ESPAÇO Query [TAB/ESPAÇOS] SQL
-            if re.match(r'^\s*\d+\s+Query\s', line):
-                return 'simple'
-            
-            # Formato MariaDB 10.11: YYMMDD HH:MM:SS
-            if re.match(r'^\d{6}\s+\d{2}:\d{2}:\d{2}\s+\d+\s+Query', line):
-                return 'mariadb'
-            
-            # Formato MySQL 8.0+: ISO timestamp
-            if re.match(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z\s+\d+\s+Query', line):
-                return 'mysql'
-            
-            # Formato MySQL 5.7: Simplified timestamp
-            if re.match(r'^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\s+\d+\s+Query', line):
-                return 'mysql'
+    # Verifica apenas as primeiras 21 linhas
+    end = -1
+    for _ in range(21):
+        end = head.find(b'\n', end + 1)
+        if end < 0:
+            end = len(head)
+            break
+    
+    match = _FORMAT_PATTERN.search(head, 0, end)
+    if match:
+        return match.lastgroup
     
     # Default para MySQL se não conseguir detectar
     return 'mysql'
 
 def get_patterns_for_format(log_format):
     """
-    Retorna os padrões regex apropriados para o formato do log
+    Retorna o padrão regex que reconhece o início de cada entrada do log
+    
+    O padrão trabalha sobre bytes (o log é lido via mmap) e captura o comando
+    da entrada (Query, Connect, Quit...). O texto de uma entrada vai do fim do
+    match até o início da próxima, incluindo as linhas de continuação.
     
     Args:
         log_format (str): 'mysql', 'mariadb' ou 'simple'
         
     Returns:
-        tuple: (query_pattern, connect_pattern, skip_header_lines)
+        re.Pattern: padrão de início de entrada (grupo 1 = comando)
     """
     if log_format == 'simple':
         # Formato simples: ID ESPAÇO Query [TAB/ESPAÇOS] SQL
-        query_pattern = re.compile(r'^\s*(\d+)\s+Query[\s\t]+(.+)$')
-        connect_pattern = re.compile(r'^\s*(\d+)\s+(Connect|Quit|Change\s+user)[\s\t]', re.IGNORECASE)
-        skip_lines = 0  # Não pula nenhuma linha
+        entry_pattern = rb'^[ \t]*\d+[ \t]+(Query|Connect|Quit|Change[ \t]+user)\b'
         
     elif log_format == 'mariadb':
         # MariaDB 10.11 formato: 251027 16:37:19     3 Query    INSERT...
-        query_pattern = re.compile(r'^(\d{6}\s+\d{2}:\d{2}:\d{2})\s+(\d+)\s+Query\s+(.+)$')
-        connect_pattern = re.compile(r'^(\d{6}\s+\d{2}:\d{2}:\d{2})\s+(\d+)\s+(Connect|Quit)', re.IGNORECASE)
-        skip_lines = 3  # Pula cabeçalho do MariaDB
+        entry_pattern = rb'^[ \t]*\d{6}[ \t]+\d{2}:\d{2}:\d{2}[ \t]+\d+[ \t]+(\w+)'
         
     else:  # MySQL
         # MySQL 8.0+ formato: 2024-10-27T16:30:45.123456Z    123 Query    SELECT...
-        query_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?)\s+(\d+)\s+Query\s+(.+)$')
-        connect_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?)\s+(\d+)\s+(Connect|Quit)', re.IGNORECASE)
-        skip_lines = 0  # MySQL não tem cabeçalho fixo
-    
-    return query_pattern, connect_pattern, skip_lines
-
-def is_system_query(query):
-    """Verifica se é uma query de sistema (information_schema, performance_schema, etc)"""
-    system_patterns = [
-        r'information_schema',
-        r'performance_schema', 
-        r'mysql\.',
-        r'sys\.',
-    ]
-    
-    query_lower = query.lower()
-    return any(re.search(pattern, query_lower) for pattern in system_patterns)
-
-def should_ignore_query(query, ignore_patterns):
-    """Verifica se a query deve ser ignorada"""
-    query_stripped = query.strip()
-    if not query_stripped:
+        entry_pattern = rb'^[ \t]*\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?[ \t]+\d+[ \t]+(\w+)'
+    
+    return re.compile(entry_pattern, re.MULTILINE)
+
+def iter_raw_queries(buf, entry_pattern, start=0, end=None):
+    """
+    Percorre o log com um único finditer e gera o texto bruto de cada Query
+    
+    Cabeçalhos e linhas que não pertencem a nenhuma entrada são descartados;
+    as linhas de continuação já fazem parte do texto da Query.
+    
+    Args:
+        buf: Conteúdo do log (bytes ou mmap)
+        entry_pattern: Padrão retornado por get_patterns_for_format
+        start: Posição inicial da varredura
+        end: Posição final (exclusiva) da varredura, None para o fim do log
+        
+    Yields:
+        bytes: Texto da query, sem espaços nas pontas
+    """
+    if end is None:
+        end = len(buf)
+    
+    query_start = None
+    for match in entry_pattern.finditer(buf, start, end):
+        if query_start is not None:
+            query = buf[query_start:match.start()].strip()
+            if query:
+                yield query
+        query_start = match.end() if match.group(1) == b'Query' else None
+    
+    if query_start is not None:
+        query = buf[query_start:end].strip()
+        if query:
+            yield query
+
+def iter_raw_queries_stream(f, entry_pattern, head=b''):
+    """
+    Variante de iter_raw_queries para entradas que não aceitam mmap (pipes, /dev/stdin)
+    
+    Lê o log em blocos de STREAM_CHUNK_SIZE bytes. Cada bloco é processado até
+    o início da sua última entrada completa; o restante fica pendente e é
+    juntado ao bloco seguinte, pois a query pode continuar nele.
+    
+    Args:
+        f: Arquivo binário aberto
+        entry_pattern: Padrão retornado por get_patterns_for_format
+        head: Bytes já lidos de f (usados na detecção do formato)
+        
+    Yields:
+        bytes: Texto da query, sem espaços nas pontas
+    """
+    pending = head
+    while True:
+        data = f.read(STREAM_CHUNK_SIZE)
+        if not data:
+            break
+        buf = pending + data if pending else data
+        
+        # A última linha pode estar incompleta; procura, de trás para frente,
+        # a última linha completa que inicia uma entrada
+        cut = buf.rfind(b'\n') + 1
+        while cut > 0:
+            cut = buf.rfind(b'\n', 0, cut - 1) + 1
+            if entry_pattern.match(buf, cut):
+                break
+        
+        yield from iter_raw_queries(buf, entry_pattern, 0, cut)
+        pending = buf[cut:]
+    
+    yield from iter_raw_queries(pending, entry_pattern)
+
+def split_log_ranges(buf, entry_pattern, chunk_size):
+    """
+    Divide o log em trechos de aproximadamente chunk_size bytes
+    
+    Cada trecho (exceto o primeiro) começa exatamente no início de uma
+    entrada, então nenhuma query fica dividida entre dois trechos.
+    
+    Returns:
+        list: Lista de tuplas (start, end)
+    """
+    bounds = [0]
+    pos = chunk_size
+    while pos < len(buf):
+        match = entry_pattern.search(buf, pos)
+        if not match:
+            break
+        bounds.append(match.start())
+        pos = match.start() + chunk_size
+    bounds.append(len(buf))
+    
+    return list(zip(bounds, bounds[1:]))
+
+def map_log_file(f):
+    """Mapeia o arquivo de log em memória (mmap não aceita arquivos vazios)"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return nullcontext(b'')
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+# As funções de classificação abaixo recebem a query em bytes, como lida do
+# log e já sem espaços nas pontas (iter_raw_queries faz o strip uma vez só);
+# só as queries aceitas são convertidas (veja encode_query)
+
+# Schemas de sistema combinados em uma única regex, compilada uma vez só
+SYSTEM_PATTERN = (
+    rb'information_schema'
+    rb'|performance_schema'
+    rb'|mysql\.'
+    rb'|sys\.'
+)
+_SYSTEM_PATTERNS = re.compile(SYSTEM_PATTERN, re.IGNORECASE)
+
+def _stop_scan(*args):
+    # Interrompe a varredura do Hyperscan no primeiro match
+    return True
+
+if HYPERSCAN_AVAILABLE:
+    # A busca de schemas percorre a query inteira; em queries longas (INSERTs
+    # em lote) o DFA do Hyperscan é ordens de grandeza mais rápido que o re
+    _SYSTEM_DATABASE = hyperscan.Database()
+    _SYSTEM_DATABASE.compile(expressions=[SYSTEM_PATTERN],
+                             flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH])
+    
+    def is_system_query(query):
+        """Verifica se é uma query de sistema (information_schema, performance_schema, etc)"""
+        try:
+            _SYSTEM_DATABASE.scan(query, match_event_handler=_stop_scan)
+        except hyperscan.ScanTerminated:
+            return True
+        return False
+else:
+    def is_system_query(query):
+        """Verifica se é uma query de sistema (information_schema, performance_schema, etc)"""
+        return _SYSTEM_PATTERNS.search(query) is not None
+
+# Comandos de sessão/controle que não fazem sentido no teste de stress
+IGNORE_PATTERNS = [
+    rb'SET SESSION sql_mode',
+    rb'SET NAMES',
+    rb'SET @@',
+    rb'SET sql_mode',
+    rb'SHOW',
+    rb'SELECT @@',
+    rb'SET character_set',
+    rb'SET FOREIGN_KEY_CHECKS',
+    rb'SET UNIQUE_CHECKS',
+    rb'SET AUTOCOMMIT',
+    rb'START TRANSACTION',
+    rb'COMMIT',
+    rb'ROLLBACK',
+    rb'USE `',
+    rb'SET SQL_SAFE_UPDATES',
+    rb'SET time_zone',
+]
+
+# Uma única alternação ancorada no início: uma passada da regex por query
+_IGNORE_PATTERN = re.compile(b'(?:' + b'|'.join(IGNORE_PATTERNS) + b')', re.IGNORECASE)
+
+def should_ignore_query(query, ignore_pattern=_IGNORE_PATTERN):
+    """Verifica se a query deve ser ignorada (começa com um dos IGNORE_PATTERNS)"""
+    if not query:
         return True
     
-    return any(pattern.search(query_stripped) for pattern in ignore_patterns)
+    return ignore_pattern.match(query) is not None
+
+# Classificações das queries; também são os índices da lista de estatísticas
+READ, WRITE, DDL, SYSTEM, UNKNOWN, IGNORED = range(6)
+QUERY_STATS_SIZE = 6
+
+# Valores aceitos em --type / query_type
+QUERY_TYPES = {'read': READ, 'write': WRITE, 'ddl': DDL}
+
+# Tipo da query pela primeira palavra-chave
+_QUERY_TYPE_BY_KEYWORD = {
+    b'SELECT': READ, b'SHOW': READ, b'DESC': READ, b'DESCRIBE': READ, b'EXPLAIN': READ,
+    b'INSERT': WRITE, b'UPDATE': WRITE, b'DELETE': WRITE, b'REPLACE': WRITE, b'TRUNCATE': WRITE,
+    b'CREATE': DDL, b'DROP': DDL, b'ALTER': DDL, b'RENAME': DDL,
+}
+_FIRST_KEYWORD = re.compile(rb'[A-Za-z]+')
 
 def get_query_type(query):
-    """Classifica o tipo da query"""
-    query_upper = query.strip().upper()
-    
-    if query_upper.startswith(('SELECT', 'SHOW', 'DESC', 'DESCRIBE', 'EXPLAIN')):
-        return 'read'
-    elif query_upper.startswith(('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'TRUNCATE')):
-        return 'write'
-    elif query_upper.startswith(('CREATE', 'DROP', 'ALTER', 'RENAME')):
-        return 'ddl'
-    else:
-        return 'unknown'
+    """Classifica o tipo da query (só a primeira palavra é copiada/convertida)"""
+    match = _FIRST_KEYWORD.match(query)
+    if not match:
+        return UNKNOWN
+    
+    return _QUERY_TYPE_BY_KEYWORD.get(match.group().upper(), UNKNOWN)
+
+def _classify_query(query):
+    if should_ignore_query(query):
+        return IGNORED
+    if is_system_query(query):
+        return SYSTEM
+    return get_query_type(query)
+
+_classify_query_cached = lru_cache(maxsize=CLASSIFY_CACHE_SIZE)(_classify_query)
+
+def classify_query(query):
+    """
+    Classifica a query para as estatísticas
+    
+    Queries curtas (as que mais se repetem em logs de ORMs e health checks)
+    passam por um cache LRU; as longas quase nunca se repetem e vão direto.
+    
+    Returns:
+        int: IGNORED, SYSTEM ou o tipo retornado por get_query_type
+    """
+    if len(query) <= CLASSIFY_CACHE_MAX_LEN:
+        return _classify_query_cached(query)
+    return _classify_query(query)
+
+def classify_query_prefiltered(query, wanted_type):
+    """
+    Variante de classify_query para extrações com --type e --max-queries
+    
+    Uma query cuja primeira palavra já é de outro tipo nunca será aceita, então
+    dispensa as verificações de ignoradas/sistema e é contada pelo tipo da
+    palavra-chave. Isso adianta a parada no limite, mas deixa as estatísticas
+    de sistema/ignoradas restritas às queries do tipo pedido.
+    """
+    q_type = get_query_type(query)
+    if q_type != wanted_type:
+        return q_type
+    return classify_query(query)
+
+def is_wanted(q_type, wanted_type):
+    """Verifica se a query classificada como q_type vai para o arquivo de saída"""
+    if wanted_type is None:
+        return q_type not in (SYSTEM, IGNORED)
+    return q_type == wanted_type
+
+def encode_query(raw_query, pretty=False):
+    """
+    Prepara uma query aceita para o arquivo de saída, em bytes UTF-8 válidos
+    (reformatada com clean_query se pretty)
+    """
+    if pretty:
+        return clean_query(raw_query.decode('utf-8', 'ignore')).encode('utf-8')
+    # Queries ASCII já estão prontas; as demais perdem os bytes UTF-8 inválidos
+    if raw_query.isascii():
+        return raw_query
+    return raw_query.decode('utf-8', 'ignore').encode('utf-8')
 
 def clean_query(query):
     """
@@ -153,208 +403,220 @@ def clean_query(query):
     
     return cleaned
 
-def extract_queries(log_file, output_file, max_queries=None, query_type=None):
+def scan_log_range(task):
+    """
+    Processa um trecho do log (executado nos processos do Pool)
+    
+    Args:
+        task: Tupla (log_file, entry_pattern, start, end, wanted_type, pretty)
+        
+    Returns:
+        tuple: (queries processadas, lista de estatísticas, queries aceitas)
+    """
+    log_file, entry_pattern, start, end, wanted_type, pretty = task
+    processed = 0
+    stats = [0] * QUERY_STATS_SIZE
+    queries = []
+    
+    with open(log_file, 'rb') as f, map_log_file(f) as buf:
+        for raw_query in iter_raw_queries(buf, entry_pattern, start, end):
+            processed += 1
+            q_type = classify_query(raw_query)
+            stats[q_type] += 1
+            if is_wanted(q_type, wanted_type):
+                queries.append(encode_query(raw_query, pretty))
+    
+    return processed, stats, queries
+
+def format_header(log_format, log_file, query_type, query_count, query_stats):
+    """Monta o cabeçalho de comentários do arquivo de saída"""
+    return (
+        f"-- Queries extraídas do {log_format.upper()} General Log\n"
+        f"-- Arquivo fonte: {log_file}\n"
+        f"-- Filtro aplicado: {query_type if query_type else 'Nenhum'}\n"
+        f"-- Total extraído: {query_count} queries\n"
+        f"-- Data de extração: {datetime.now()}\n"
+        "--\n"
+        "-- ESTATÍSTICAS:\n"
+        f"--   Leitura: {query_stats[READ]}\n"
+        f"--   Escrita: {query_stats[WRITE]}\n"
+        f"--   DDL: {query_stats[DDL]}\n"
+        f"--   Sistema: {query_stats[SYSTEM]}\n"
+        f"--   Não classificadas: {query_stats[UNKNOWN]}\n"
+        f"--   Ignoradas: {query_stats[IGNORED]}\n"
+    )
+
+def write_queries(out, raw_queries, query_stats, max_queries=None, wanted_type=None, pretty=False):
+    """
+    Classifica as queries e grava as aceitas no arquivo de saída
+    
+    Returns:
+        int: Número de queries gravadas
+    """
+    query_count = 0
+    
+    # Com filtro de tipo e limite, descarta cedo as queries de outros tipos
+    if wanted_type is not None and max_queries:
+        def classify(query):
+            return classify_query_prefiltered(query, wanted_type)
+    else:
+        classify = classify_query
+    
+    # Agrupa as queries em blocos para reduzir o número de write()
+    chunk = []
+    for raw_num, raw_query in enumerate(raw_queries, 1):
+        if raw_num % 100000 == 0:
+            print_colored(f"Processadas {raw_num:,} queries, {query_count:,} extraídas", Fore.BLUE)
+        
+        q_type = classify(raw_query)
+        query_stats[q_type] += 1
+        
+        # Aplica filtro de tipo se especificado
+        if is_wanted(q_type, wanted_type):
+            query_count += 1
+            chunk.append(b"-- Query %d\n%s;\n\n" % (query_count, encode_query(raw_query, pretty)))
+            if len(chunk) >= WRITE_CHUNK_SIZE:
+                out.write(b''.join(chunk))
+                chunk.clear()
+            if max_queries and query_count >= max_queries:
+                break
+    out.write(b''.join(chunk))
+    
+    return query_count
+
+def write_queries_parallel(out, log_file, buf, entry_pattern, query_stats, jobs, wanted_type=None, pretty=False):
+    """
+    Variante de write_queries que processa trechos do log em um Pool de processos
+    
+    Returns:
+        int: Número de queries gravadas
+    """
+    print_colored(f"Usando {jobs} processos", Fore.CYAN)
+    query_count = 0
+    processed = 0
+    tasks = iter([(log_file, entry_pattern, start, end, wanted_type, pretty)
+                  for start, end in split_log_ranges(buf, entry_pattern, PARALLEL_CHUNK_SIZE)])
+    
+    with Pool(jobs) as pool:
+        # Envia os trechos em janela (Pool.imap enfileira todos de uma vez): um
+        # novo trecho só sai quando o resultado mais antigo é gravado
+        pending = deque(pool.apply_async(scan_log_range, (task,))
+                        for task in islice(tasks, jobs * PARALLEL_PENDING_PER_JOB))
+        while pending:
+            range_processed, range_stats, range_queries = pending.popleft().get()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.apply_async(scan_log_range, (task,)))
+            
+            processed += range_processed
+            for q_type, count in enumerate(range_stats):
+                query_stats[q_type] += count
+            chunk = []
+            for query in range_queries:
+                query_count += 1
+                chunk.append(b"-- Query %d\n%s;\n\n" % (query_count, query))
+            out.write(b''.join(chunk))
+            print_colored(f"Processadas {processed:,} queries, {query_count:,} extraídas", Fore.BLUE)
+    
+    return query_count
+
+def extract_queries(log_file, output_file, max_queries=None, query_type=None, jobs=None, pretty=False):
     """
     Extrai queries SQL válidas do arquivo de log do MySQL/MariaDB
     
     Args:
-        log_file: Arquivo de log do MySQL/MariaDB
+        log_file: Arquivo de log do MySQL/MariaDB (também aceita pipes e /dev/stdin)
         output_file: Arquivo de saída
         max_queries: Número máximo de queries para extrair
         query_type: Tipo de queries ('read', 'write', 'ddl' ou None para todas)
+        jobs: Número de processos para logs grandes (None = número de CPUs)
+        pretty: Reformata as queries com clean_query (por padrão ficam como no log)
     """
-    queries = []
-    current_query = ""
-    in_query = False
-    query_count = 0
-    query_stats = defaultdict(int)
-    
-    # Detecta automaticamente o formato do log
-    log_format = detect_log_format(log_file)
-    print_colored(f"📊 Formato detectado: {log_format.upper()}", Fore.CYAN)
-    
-    # Obtém padrões apropriados para o formato
-    query_pattern, connect_pattern, skip_lines = get_patterns_for_format(log_format)
-    
-    ignore_patterns = [
-        r'SET SESSION sql_mode',
-        r'SET NAMES',
-        r'SET @@',
-        r'SET sql_mode',
-        r'SHOW',
-        r'SELECT @@',
-        r'SET character_set',
-        r'SET FOREIGN_KEY_CHECKS',
-        r'SET UNIQUE_CHECKS',
-        r'SET AUTOCOMMIT',
-        r'START TRANSACTION',
-        r'COMMIT',
-        r'ROLLBACK',
-        r'USE `',
-        r'SET SQL_SAFE_UPDATES',
-        r'SET time_zone',
-    ]
-    ignore_compiled = [re.compile(pattern, re.IGNORECASE) for pattern in ignore_patterns]
-    
-    print_colored(f"Processando arquivo: {log_file}", Fore.YELLOW)
+    query_stats = [0] * QUERY_STATS_SIZE
+    wanted_type = QUERY_TYPES[query_type] if query_type else None
+    jobs = jobs or os.cpu_count() or 1
     
     try:
-        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line_num, line in enumerate(f, 1):
-                # Pula linhas de cabeçalho conforme o formato
-                if line_num <= skip_lines:
-                    continue
-                    
-                if line_num % 100000 == 0:
-                    print_colored(f"Processadas {line_num:,} linhas, {len(queries):,} queries extraídas", Fore.BLUE)
+        with open(log_file, 'rb') as f:
+            streaming = not stat.S_ISREG(os.fstat(f.fileno()).st_mode)
+            if streaming:
+                # Pipes não aceitam mmap nem podem ser relidos: o primeiro bloco
+                # serve para detectar o formato e depois é processado normalmente
+                log_map = nullcontext(f.read(STREAM_CHUNK_SIZE))
+            else:
+                log_map = map_log_file(f)
+            
+            with log_map as buf:
+                # Detecta automaticamente o formato do log
+                log_format = detect_log_format(buf)
+                print_colored(f"📊 Formato detectado: {log_format.upper()}", Fore.CYAN)
                 
-                line = line.strip()
-                if not line:
-                    continue
+                # Obtém o padrão apropriado para o formato
+                entry_pattern = get_patterns_for_format(log_format)
                 
-                # Verifica se é uma linha de conexão/quit
-                if connect_pattern.match(line):
-                    if in_query and current_query.strip():
-                        # Finaliza query anterior se existir
-                        query = clean_query(current_query)
-                        
-                        # Verifica se é query de sistema primeiro
-                        if is_system_query(query):
-                            query_stats['system'] += 1
-                        elif not should_ignore_query(query, ignore_compiled):
-                            q_type = get_query_type(query)
-                            query_stats[q_type] += 1
-                            
-                            # Aplica filtro de tipo se especificado
-                            if query_type is None or q_type == query_type:
-                                queries.append(query)
-                                query_count += 1
-                                if max_queries and query_count >= max_queries:
-                                    break
-                        else:
-                            query_stats['ignored'] += 1
-                    current_query = ""
-                    in_query = False
-                    continue
+                # As queries são gravadas à medida que são encontradas; o cabeçalho com as
+                # estatísticas só é conhecido no fim, então reserva espaço para ele no início
+                header_size = len(format_header(log_format, log_file, query_type, 0, query_stats).encode('utf-8')) + HEADER_SLACK
                 
-                # Verifica se é início de uma nova query
-                match = query_pattern.match(line)
-                if match:
-                    # Salva query anterior se existir
-                    if in_query and current_query.strip():
-                        query = clean_query(current_query)
+                print_colored(f"Processando arquivo: {log_file}", Fore.YELLOW)
+                
+                with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out:
+                    # Saída sem seek (pipe, /dev/stdout): as queries vão para um arquivo
+                    # temporário e são copiadas para a saída depois do cabeçalho
+                    seekable = out.seekable()
+                    body_file = nullcontext(out) if seekable else tempfile.TemporaryFile(buffering=OUTPUT_BUFFER_SIZE)
+                    
+                    with body_file as body:
+                        if seekable:
+                            body.write(b' ' * header_size)
                         
-                        # Verifica se é query de sistema primeiro
-                        if is_system_query(query):
-                            query_stats['system'] += 1
-                        elif not should_ignore_query(query, ignore_compiled):
-                            q_type = get_query_type(query)
-                            query_stats[q_type] += 1
-                            
-                            # Aplica filtro de tipo se especificado
-                            if query_type is None or q_type == query_type:
-                                queries.append(query)
-                                query_count += 1
-                                if max_queries and query_count >= max_queries:
-                                    break
+                        # Com --max-queries a leitura sequencial para assim que atinge o
+                        # limite, o que costuma ser mais rápido que processar o log todo
+                        if streaming:
+                            query_count = write_queries(body, iter_raw_queries_stream(f, entry_pattern, buf),
+                                                        query_stats, max_queries, wanted_type, pretty)
+                        elif jobs > 1 and not max_queries and len(buf) >= PARALLEL_MIN_SIZE:
+                            query_count = write_queries_parallel(body, log_file, buf, entry_pattern, query_stats,
+                                                                 jobs, wanted_type, pretty)
                         else:
-                            query_stats['ignored'] += 1
-                    
-                    # Inicia nova query - CORREÇÃO PRINCIPAL AQUI
-                    if log_format == 'simple':
-                        # Para formato simples: (connection_id, query_text)
-                        connection_id, query_text = match.groups()
-                    else:
-                        # Para outros formatos: (timestamp, connection_id, query_text)
-                        timestamp, connection_id, query_text = match.groups()
-                    
-                    if not should_ignore_query(query_text, ignore_compiled):
-                        current_query = query_text
-                        in_query = True
-                    else:
-                        query_stats['ignored'] += 1
-                        current_query = ""
-                        in_query = False
+                            query_count = write_queries(body, iter_raw_queries(buf, entry_pattern),
+                                                        query_stats, max_queries, wanted_type, pretty)
                         
-                elif in_query:
-                    # Linha de continuação da query - CORREÇÃO AQUI TAMBÉM
-                    is_continuation = True
-                    
-                    if log_format == 'simple':
-                        # No formato simples, se não tem ID + comando, é continuação
-                        is_continuation = not re.match(r'^\s*\d+\s+(Query|Connect|Quit|Change)', line)
-                    elif log_format == 'mariadb':
-                        # No MariaDB, se não começa com timestamp, é continuação
-                        is_continuation = not re.match(r'^\d{6}\s+\d{2}:\d{2}:\d{2}', line)
-                    else:
-                        # No MySQL, se não começa com timestamp ISO, é continuação
-                        is_continuation = not re.match(r'^\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}', line)
-                    
-                    if is_continuation:
-                        current_query += "\n" + line
-        
-        # Processa última query se existir
-        if in_query and current_query.strip():
-            query = clean_query(current_query)
-            if is_system_query(query):
-                query_stats['system'] += 1
-            elif not should_ignore_query(query, ignore_compiled):
-                q_type = get_query_type(query)
-                query_stats[q_type] += 1
-                if query_type is None or q_type == query_type:
-                    queries.append(query)
-            else:
-                query_stats['ignored'] += 1
+                        header = format_header(log_format, log_file, query_type, query_count, query_stats).encode('utf-8')
+                        if seekable:
+                            out.seek(0)
+                            out.write(header.ljust(header_size - 2) + b'\n\n')
+                        else:
+                            out.write(header + b'\n\n')
+                            body.seek(0)
+                            shutil.copyfileobj(body, out, OUTPUT_BUFFER_SIZE)
     
-    except FileNotFoundError:
-        print_colored(f"❌ Erro: Arquivo {log_file} não encontrado!", Fore.RED)
+    except FileNotFoundError as e:
+        print_colored(f"❌ Erro: Arquivo {e.filename} não encontrado!", Fore.RED)
         return
-    except PermissionError:
-        print_colored(f"❌ Erro: Sem permissão para ler o arquivo {log_file}!", Fore.RED)
+    except PermissionError as e:
+        if e.filename == output_file:
+            print_colored(f"❌ Erro: Sem permissão para escrever no arquivo {output_file}!", Fore.RED)
+        else:
+            print_colored(f"❌ Erro: Sem permissão para ler o arquivo {log_file}!", Fore.RED)
         return
     except Exception as e:
         print_colored(f"❌ Erro inesperado: {e}", Fore.RED)
         return
     
-    # Salva queries no arquivo de saída
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"-- Queries extraídas do {log_format.upper()} General Log\n")
-            f.write(f"-- Arquivo fonte: {log_file}\n")
-            f.write(f"-- Filtro aplicado: {query_type if query_type else 'Nenhum'}\n")
-            f.write(f"-- Total extraído: {len(queries)} queries\n")
-            f.write(f"-- Data de extração: {datetime.now()}\n")
-            f.write("--\n")
-            f.write("-- ESTATÍSTICAS:\n")
-            f.write(f"--   Leitura: {query_stats['read']}\n")
-            f.write(f"--   Escrita: {query_stats['write']}\n")
-            f.write(f"--   DDL: {query_stats['ddl']}\n")
-            f.write(f"--   Sistema: {query_stats['system']}\n")
-            f.write(f"--   Não classificadas: {query_stats['unknown']}\n")
-            f.write(f"--   Ignoradas: {query_stats['ignored']}\n")
-            f.write("\n\n")
-            
-            for i, query in enumerate(queries, 1):
-                f.write(f"-- Query {i}\n")
-                f.write(f"{query};\n\n")
-    
-    except PermissionError:
-        print_colored(f"❌ Erro: Sem permissão para escrever no arquivo {output_file}!", Fore.RED)
-        return
-    
     # Estatísticas finais
-    total_processed = sum(query_stats.values())
+    total_processed = sum(query_stats)
     
     print_colored("\n📊 ESTATÍSTICAS DE EXTRAÇÃO", Fore.GREEN)
     print(f"Total de queries processadas: {total_processed:,}")
-    print_colored(f"  • Queries de leitura (SELECT): {query_stats['read']:,}", Fore.CYAN)
-    print_colored(f"  • Queries de escrita (INSERT/UPDATE/DELETE): {query_stats['write']:,}", Fore.YELLOW)
-    print_colored(f"  • Queries DDL (CREATE/DROP/ALTER): {query_stats['ddl']:,}", Fore.MAGENTA)
-    print_colored(f"  • Queries de sistema (information_schema, etc): {query_stats['system']:,}", Fore.BLUE)
-    print_colored(f"  • Queries não classificadas: {query_stats['unknown']:,}", Fore.WHITE)
-    print_colored(f"  • Queries ignoradas (SET, etc): {query_stats['ignored']:,}", Fore.RED)
+    print_colored(f"  • Queries de leitura (SELECT): {query_stats[READ]:,}", Fore.CYAN)
+    print_colored(f"  • Queries de escrita (INSERT/UPDATE/DELETE): {query_stats[WRITE]:,}", Fore.YELLOW)
+    print_colored(f"  • Queries DDL (CREATE/DROP/ALTER): {query_stats[DDL]:,}", Fore.MAGENTA)
+    print_colored(f"  • Queries de sistema (information_schema, etc): {query_stats[SYSTEM]:,}", Fore.BLUE)
+    print_colored(f"  • Queries não classificadas: {query_stats[UNKNOWN]:,}", Fore.WHITE)
+    print_colored(f"  • Queries ignoradas (SET, etc): {query_stats[IGNORED]:,}", Fore.RED)
     print()
-    print(f"Queries extraídas para o arquivo: {len(queries):,}")
+    print(f"Queries extraídas para o arquivo: {query_count:,}")
     print()
     print_colored(f"✅ Queries salvas em: {output_file}", Fore.GREEN)
 
@@ -368,6 +630,7 @@ Exemplos de uso:
   python extract_queries.py /var/log/mysql/general.log -o queries.sql
   python extract_queries.py mysql.log -o select_queries.sql -t read -m 1000
   python extract_queries.py mariadb.log -o insert_queries.sql -t write
+  zcat general.log.gz | python extract_queries.py /dev/stdin -o queries.sql
   
 Formatos suportados automaticamente:
   - Formato simples: ID Query SQL (com TABs ou espaços)
@@ -382,8 +645,12 @@ Formatos suportados automaticamente:
                        help='Arquivo de saída (padrão: queries.sql)')
     parser.add_argument('-m', '--max-queries', type=int, 
                        help='Número máximo de queries para extrair')
-    parser.add_argument('-t', '--type', choices=['read', 'write', 'ddl'], 
+    parser.add_argument('-t', '--type', choices=list(QUERY_TYPES), 
                        help='Tipo de queries a extrair (read=SELECT, write=INSERT/UPDATE/DELETE, ddl=CREATE/DROP/ALTER)')
+    parser.add_argument('-j', '--jobs', type=int,
+                       help='Número de processos para logs grandes (padrão: número de CPUs)')
+    parser.add_argument('--pretty', action='store_true',
+                       help='Reformata as queries para leitura (colapsa espaços e quebra queries longas)')
     
     args = parser.parse_args()
     
@@ -391,7 +658,7 @@ Formatos suportados automaticamente:
         print_colored(f"❌ Erro: Arquivo {args.log_file} não encontrado!", Fore.RED)
         return 1
     
-    extract_queries(args.log_file, args.output, args.max_queries, args.type)
+    extract_queries(args.log_file, args.output, args.max_queries, args.type, args.jobs, args.pretty)
     return 0
 
 if __name__ == '__main__':
@@ -7,26 +7,372 @@ Este script executa queries SQL de forma concorrente contra um servidor MySQL
 para teste de performance e stress testing.
 """
 import argparse
-import threading
+import asyncio
+import atexit
+import io
+import queue
 import time
 import random
+import re
 import logging
+import logging.handlers
 import sys
 import os
+from array import array
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List, Optional
-from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 import pymysql
+from pymysql.constants import CLIENT
+from pymysql.cursors import SSCursor
+from dbutils.pooled_db import PooledDB
 from dotenv import load_dotenv
 from colorama import init, Fore, Back, Style
 
+# Driver assíncrono opcional, usado só com --async
+try:
+    import asyncmy
+    ASYNCMY_AVAILABLE = True
+except ImportError:
+    ASYNCMY_AVAILABLE = False
+
+# Event loop do libuv (opcional): I/O de socket mais barato no modo --async
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Inicializar colorama para cores no terminal
 init(autoreset=True)
 
-@dataclass
+# Máximo de prepared statements mantidos por conexão (o servidor limita o total
+# em max_prepared_stmt_count, somando todas as conexões)
+PREPARED_CACHE_SIZE = 512
+
+# Códigos de erro do MySQL tratados pelo cache de prepared statements
+ER_UNKNOWN_STMT_HANDLER = 1243  # statement perdido (ex: conexão refeita pelo pool)
+ER_UNSUPPORTED_PS = 1295        # comando não pode ser preparado
+
+# Trechos fixos do relatório, montados uma vez só
+REPORT_SEPARATOR = f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}"
+THREAD_REPORT_TEMPLATE = (
+    f"\n{Fore.CYAN}Thread {{thread_id}}:{Style.RESET_ALL}\n"
+    "  Queries executadas: {queries_executed}\n"
+    f"  Bem-sucedidas: {Fore.GREEN}{{successful_queries}}{Style.RESET_ALL}\n"
+    f"  Com falha: {Fore.RED}{{failed_queries}}{Style.RESET_ALL}\n"
+    "  Taxa de sucesso: {success_rate:.1f}%\n"
+    "  Tempo total: {total_time:.2f}s\n"
+    "  Queries/seg: {qps:.2f}\n"
+    "  Tempo médio: {avg_response_time:.4f}s\n"
+    "  Tempo mín: {min_response_time:.4f}s\n"
+    "  Tempo máx: {max_response_time:.4f}s"
+)
+THREAD_ERRORS_TEMPLATE = f"\n  {Fore.RED}Erros: {{error_count}}{Style.RESET_ALL}"
+
+# Classificação dos erros no retry: repetir (após backoff), refazer a conexão
+# ou desistir logo (erros de SQL/permissão não mudam em uma nova tentativa)
+RETRY, RECONNECT, FATAL = range(3)
+# Servidor fora do ar / conexão perdida, inclusive a desconexão por inatividade
+# do MySQL 8.0.24+ (4031) e a conexão derrubada por KILL no MariaDB (1927)
+CONNECTION_ERRORS = {1927, 2003, 2006, 2013, 2055, 4031}
+TRANSIENT_ERRORS = {1205, 1213}  # lock wait timeout / deadlock
+# Faixa dos erros do cliente (pymysql/libmysqlclient); os demais códigos a
+# partir de 1000 vêm do servidor
+CLIENT_ERRORS = range(2000, 3000)
+
+# Backoff exponencial entre tentativas: RETRY_BASE_DELAY * 2**tentativa + jitter
+RETRY_BASE_DELAY = 0.1
+RETRY_JITTER = 0.05
+
+def classify_error(error: Exception) -> int:
+    """Decide o que fazer com uma query que falhou: RETRY, RECONNECT ou FATAL"""
+    if isinstance(error, (pymysql.err.InterfaceError, ConnectionError)):
+        return RECONNECT
+    errno = error.args[0] if error.args and isinstance(error.args[0], int) else None
+    if errno in CONNECTION_ERRORS:
+        return RECONNECT
+    if errno in TRANSIENT_ERRORS:
+        return RETRY
+    # Demais erros do servidor (sintaxe, tabela inexistente, permissão, chave
+    # duplicada, max_execution_time, constraint...): repetir não muda o resultado
+    if errno is not None and errno >= 1000 and errno not in CLIENT_ERRORS:
+        return FATAL
+    return RETRY
+
+def retry_delay(attempt: int) -> float:
+    """Pausa antes da próxima tentativa (exponencial, com jitter para as threads não sincronizarem)"""
+    return RETRY_BASE_DELAY * 2 ** attempt + random.random() * RETRY_JITTER
+
+# Histograma de latência (estilo HDR): valores abaixo de 2**(BITS+1) ns são
+# exatos; acima, cada potência de 2 é dividida em 2**BITS faixas (erro < 1/32)
+LATENCY_SUB_BUCKET_BITS = 5
+LATENCY_SUB_BUCKETS = 1 << LATENCY_SUB_BUCKET_BITS
+
+def latency_bucket(ns: int) -> int:
+    """Índice da faixa do histograma para uma latência em nanossegundos"""
+    if ns < 2 * LATENCY_SUB_BUCKETS:
+        return ns
+    shift = ns.bit_length() - (LATENCY_SUB_BUCKET_BITS + 1)
+    return (shift + 1) * LATENCY_SUB_BUCKETS + (ns >> shift) - LATENCY_SUB_BUCKETS
+
+def latency_bucket_value(index: int) -> int:
+    """Valor (ns) que representa a faixa: o ponto médio dela"""
+    if index < 2 * LATENCY_SUB_BUCKETS:
+        return index
+    shift = index // LATENCY_SUB_BUCKETS - 1
+    lower = (index % LATENCY_SUB_BUCKETS + LATENCY_SUB_BUCKETS) << shift
+    return lower + (1 << shift) // 2
+
+LATENCY_BUCKETS = latency_bucket(2 ** 63 - 1) + 1
+
+def latency_percentiles(histogram: array, percentiles: List[float]) -> List[float]:
+    """Percentis (em segundos) a partir das contagens do histograma"""
+    total = sum(histogram)
+    values = []
+    if not total:
+        return [0.0] * len(percentiles)
+        
+    targets = iter(sorted(percentiles))
+    target = next(targets)
+    rank = max(1, -(-total * target // 100))
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        while seen >= rank:
+            values.append(latency_bucket_value(index) / 1e9)
+            target = next(targets, None)
+            if target is None:
+                return values
+            rank = max(1, -(-total * target // 100))
+    return values
+
+# Mensagens de erro guardadas por thread (o relatório mostra só as primeiras;
+# as demais entram apenas na contagem)
+MAX_ERRORS_PER_THREAD = 10
+
+# Buffer de leitura do arquivo de queries
+LOAD_BUFFER_SIZE = 1 << 20
+
+# Queries até este tamanho passam por sys.intern: as repetidas (comuns em logs
+# de ORMs) ficam com uma única cópia em memória
+INTERN_MAX_LEN = 512
+
+def clean_query_block(block: str) -> str:
+    """Remove espaços e o ';' final do texto de um bloco '-- Query N'"""
+    query_sql = block.strip()
+    if query_sql.endswith(';;'):
+        query_sql = query_sql[:-2].strip()
+    elif query_sql.endswith(';'):
+        query_sql = query_sql[:-1].strip()
+    return query_sql
+
+# Linha de início de bloco gerada pelo extrator ('-- Query N'); aceita também
+# anotações no resto da linha ('-- Query 12: ...', '-- Query 12 (read)'),
+# comuns em arquivos editados à mão, que são descartadas junto com o cabeçalho
+QUERY_HEADER_PATTERN = re.compile(r'^-- Query[ \t]*\d+\b[^\n]*\n', re.MULTILINE)
+
+def iter_queries(queries_file: str):
+    """
+    Lê o arquivo de queries em blocos e gera o SQL de cada bloco '-- Query N'
+    
+    Cada leitura é dividida nos cabeçalhos por um único split da regex
+    compilada, sem percorrer o arquivo linha a linha em Python. Só a última
+    linha (possivelmente incompleta) passa de uma leitura para a outra, e só a
+    query que cruza a divisa fica acumulada. O cabeçalho de comentários gerado
+    pelo extrator (antes do primeiro bloco) é descartado.
+    """
+    with open(queries_file, 'r', encoding='utf-8', buffering=LOAD_BUFFER_SIZE) as f:
+        parts = None  # Pedaços da query em aberto (None: ainda antes do primeiro bloco)
+        tail = ''
+        # O '\n' final fecha a última linha do arquivo, se ela não tiver quebra
+        for chunk in chain(iter(lambda: f.read(LOAD_BUFFER_SIZE), ''), ('\n',)):
+            text = tail + chunk
+            # A última linha pode ser um cabeçalho cortado: fica para a próxima leitura
+            end = text.rfind('\n') + 1
+            tail = text[end:]
+            blocks = QUERY_HEADER_PATTERN.split(text[:end])
+            
+            if parts is not None:
+                parts.append(blocks[0])
+            if len(blocks) > 1:
+                if parts is not None:
+                    yield clean_query_block(''.join(parts))
+                yield from map(clean_query_block, islice(blocks, 1, len(blocks) - 1))
+                parts = [blocks[-1]]
+                
+        if parts is not None:
+            yield clean_query_block(''.join(parts))
+
+# Número de queries sorteadas de uma vez por cada thread
+QUERY_CHOICE_BATCH = 4096
+
+def iter_random_queries(queries: List[Tuple[str, bool]], batch_size: int = QUERY_CHOICE_BATCH):
+    """Sorteia queries (com reposição) em blocos, com um gerador próprio da thread"""
+    rng = random.Random()
+    while True:
+        yield from rng.choices(queries, k=batch_size)
+
+# Início de query que devolve linhas: SELECT, SHOW, DESC/DESCRIBE, EXPLAIN,
+# WITH (CTE) e SELECT entre parênteses, depois de eventuais comentários
+# /* */ e linhas de comentário '-- ' ou '#'
+RESULT_SET_PATTERN = re.compile(
+    r'\s*(?:/\*.*?\*/\s*|(?:--(?=\s)|#)[^\n]*\n\s*)*'
+    r'(?:(?:SELECT|SHOW|DESC|DESCRIBE|EXPLAIN|WITH)\b|\()',
+    re.IGNORECASE | re.DOTALL
+)
+
+def returns_rows(query: str) -> bool:
+    """
+    Verifica se a query devolve um resultado com linhas para buscar
+    
+    Chamada uma vez por query em load_queries; o resultado fica guardado junto
+    com o SQL e a execução só consulta o flag.
+    
+    >>> returns_rows('SELECT 1')
+    True
+    >>> returns_rows('/* app */ (SELECT 1) UNION (SELECT 2)')
+    True
+    >>> returns_rows('-- note\\nSELECT 1')
+    True
+    >>> returns_rows('# note\\n--\\nshow tables')
+    True
+    >>> returns_rows('-- SELECT 1\\nUPDATE t SET a = 1')
+    False
+    >>> returns_rows('INSERT INTO t SELECT 1')
+    False
+    """
+    return RESULT_SET_PATTERN.match(query) is not None
+
+def group_batches(queries: List[Tuple[str, bool]]) -> List[List[Tuple[str, bool]]]:
+    """
+    Separa as queries sorteadas em dois lotes, cada um enviado em um round-trip:
+    as leituras (queries com resultado) e as demais (escritas, confirmadas com
+    um único commit)
+    """
+    if len(queries) == 1:
+        return [queries]
+        
+    selects = [query for query in queries if query[1]]
+    writes = [query for query in queries if not query[1]]
+    return [batch for batch in (selects, writes) if batch]
+
+def send_query(cursor, query: str):
+    """Envia a query pelo cursor (sem prepared statements)"""
+    cursor.execute(query)
+
+def close_quietly(resource):
+    """Fecha o cursor (ou a conexão) ignorando erros: a conexão pode já ter caído"""
+    try:
+        resource.close()
+    except Exception:
+        pass
+
+def consume_rows(cursor):
+    """
+    Lê as linhas do resultado atual de um SSCursor até o fim, uma por vez, sem
+    montar a lista
+    
+    Só depois do fim do resultado o pymysql sabe se há outro: nextset() sobre
+    um resultado não lido retorna None e os seguintes ficam no socket.
+    """
+    for _ in cursor.fetchall_unbuffered():
+        pass
+
+@lru_cache(maxsize=PREPARED_CACHE_SIZE)
+def normalize_query(query: str) -> str:
+    """
+    Normaliza os espaços da query: serve só de chave do cache de prepared
+    statements, nunca é enviada ao servidor (junta comentários '--' com a
+    linha seguinte e mexe nos espaços dentro de literais)
+    """
+    return ' '.join(query.split())
+
+class PreparedStatementCache:
+    """
+    Prepared statements (PREPARE/EXECUTE) de uma conexão, em LRU
+    
+    Cada query é preparada no servidor na primeira execução e depois só
+    executada, sem novo parse. O texto preparado é o original da query, com
+    as quebras de linha e os literais intactos (as queries vêm do log com os
+    valores já embutidos); a versão normalizada é só a chave do cache.
+    """
+    
+    def __init__(self, maxsize: int = PREPARED_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.statements = OrderedDict()  # chave -> (nome, texto preparado)
+        self.unsupported = set()
+        self.next_id = 0
+        
+    def execute(self, cursor, query: str):
+        """Executa a query pelo prepared statement correspondente"""
+        key = normalize_query(query)
+        if key in self.unsupported:
+            cursor.execute(query)
+            return
+            
+        entry = self.statements.get(key)
+        # Mesma chave com outro texto (só os espaços diferem, talvez dentro de
+        # um literal): prepara o texto novo no lugar do antigo
+        if entry is None or entry[1] != query:
+            name = self.prepare(cursor, key, query)
+            if name is None:
+                cursor.execute(query)
+                return
+        else:
+            name = entry[0]
+            self.statements.move_to_end(key)
+            
+        try:
+            cursor.execute(f"EXECUTE {name}")
+        except pymysql.MySQLError as e:
+            if e.args[0] != ER_UNKNOWN_STMT_HANDLER:
+                raise
+            # A conexão foi refeita e perdeu os statements: prepara de novo
+            self.reset()
+            cursor.execute(f"EXECUTE {self.prepare(cursor, key, query)}")
+            
+    def reset(self):
+        """Esquece os statements (a conexão foi trocada e eles não existem mais)"""
+        self.statements.clear()
+        
+    def prepare(self, cursor, key: str, query: str) -> Optional[str]:
+        """Prepara a query no servidor; retorna None se ela não puder ser preparada"""
+        entry = self.statements.get(key)
+        # Reaproveita o nome ao trocar o texto de uma chave: PREPARE sobre um
+        # nome existente substitui o statement anterior
+        name = entry[0] if entry is not None else f"stress_stmt_{self.next_id}"
+        try:
+            cursor.execute(f"PREPARE {name} FROM %s", (query,))
+        except pymysql.MySQLError as e:
+            if e.args[0] != ER_UNSUPPORTED_PS:
+                raise
+            # Um PREPARE que falha também descarta o statement anterior do nome
+            self.statements.pop(key, None)
+            self.unsupported.add(key)
+            return None
+            
+        if entry is None:
+            self.next_id += 1
+        self.statements[key] = (name, query)
+        self.statements.move_to_end(key)
+        if len(self.statements) > self.maxsize:
+            _, (evicted, _) = self.statements.popitem(last=False)
+            cursor.execute(f"DEALLOCATE PREPARE {evicted}")
+        return name
+
+@dataclass(slots=True)
 class TestResults:
-    """Classe para armazenar resultados do teste"""
+    """
+    Classe para armazenar resultados do teste
+    
+    Cada thread tem o seu e só ela o atualiza, então não há lock; com slots o
+    acesso aos atributos no laço do worker é mais rápido.
+    """
     thread_id: int
     queries_executed: int = 0
     successful_queries: int = 0
@@ -35,11 +381,43 @@ class TestResults:
     avg_response_time: float = 0.0
     min_response_time: float = float('inf')
     max_response_time: float = 0.0
-    errors: List[str] = None
+    # Acumuladores em nanossegundos inteiros (convertidos para segundos em finish)
+    total_response_ns: int = 0
+    min_response_ns: int = sys.maxsize
+    max_response_ns: int = 0
+    latency_histogram: array = field(default_factory=lambda: array('q', [0]) * LATENCY_BUCKETS)
+    error_count: int = 0
+    errors: List[str] = field(default_factory=list)
     
-    def __post_init__(self):
-        if self.errors is None:
-            self.errors = []
+    def add_response(self, exec_ns: int, count: int = 1):
+        """
+        Acumula o tempo (em ns) de queries bem-sucedidas sem guardar cada amostra
+        (em um lote, cada query conta com o tempo médio do lote)
+        """
+        per_query = exec_ns // count
+        self.latency_histogram[latency_bucket(per_query)] += count
+        self.successful_queries += count
+        self.total_response_ns += exec_ns
+        if per_query < self.min_response_ns:
+            self.min_response_ns = per_query
+        if per_query > self.max_response_ns:
+            self.max_response_ns = per_query
+            
+    def add_error(self, message: str):
+        """Conta o erro e guarda a mensagem enquanto houver espaço"""
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS_PER_THREAD:
+            self.errors.append(message)
+            
+    def finish(self, total_time: float):
+        """Fecha as estatísticas da thread"""
+        self.total_time = total_time
+        if self.successful_queries:
+            self.avg_response_time = self.total_response_ns / self.successful_queries / 1e9
+            self.min_response_time = self.min_response_ns / 1e9
+            self.max_response_time = self.max_response_ns / 1e9
+        else:
+            self.min_response_time = 0.0
 
 class MySQLStressTest:
     """Classe principal para o teste de stress do MySQL"""
@@ -50,47 +428,55 @@ class MySQLStressTest:
         self.results = []
         self.start_time = None
         self.end_time = None
-        self.lock = threading.Lock()
+        self.pool = None
+        # Valores numéricos da configuração, convertidos uma vez só
+        self.port = int(config['MYSQL_PORT'])
+        self.connection_timeout = int(config.get('CONNECTION_TIMEOUT', 10))
+        self.query_timeout = int(config.get('QUERY_TIMEOUT', 30))
+        self.max_retries = int(config.get('MAX_RETRIES', 3))
         self.setup_logging()
         
     def setup_logging(self):
-        """Configura o sistema de logging"""
+        """
+        Configura o sistema de logging
+        
+        As threads só colocam os registros em uma fila; uma thread do
+        QueueListener é a única que escreve no arquivo e no terminal, então os
+        workers não disputam o lock dos handlers.
+        """
         log_level = getattr(logging, self.config.get('LOG_LEVEL', 'INFO'))
         log_format = '%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
         
-        logging.basicConfig(
-            level=log_level,
-            format=log_format,
-            handlers=[
+        root_logger = logging.getLogger()
+        if not root_logger.handlers:
+            formatter = logging.Formatter(log_format)
+            handlers = [
                 logging.FileHandler(self.config.get('LOG_FILE', 'stress_test.log')),
                 logging.StreamHandler()
             ]
-        )
+            for handler in handlers:
+                handler.setFormatter(formatter)
+                
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, *handlers)
+            listener.start()
+            # Esvazia a fila antes de o programa terminar
+            atexit.register(listener.stop)
+            
+            root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        root_logger.setLevel(log_level)
         self.logger = logging.getLogger(__name__)
         
     def load_queries(self, queries_file: str) -> int:
-        """Carrega queries do arquivo SQL"""
+        """Carrega queries do arquivo SQL, como pares (sql, devolve_linhas)"""
         self.logger.info(f"Carregando queries de: {queries_file}")
         
         try:
-            with open(queries_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Separa as queries pelo comentário -- Query
-            query_blocks = content.split('-- Query')[1:]  # Remove primeira entrada vazia
-            
-            for block in query_blocks:
-                lines = block.strip().split('\n')
-                # Remove número da query e pega só o SQL
-                query_sql = '\n'.join(lines[1:]).strip()
-                # Remove o ';' final se existir
-                if query_sql.endswith(';;'):
-                    query_sql = query_sql[:-2].strip()
-                elif query_sql.endswith(';'):
-                    query_sql = query_sql[:-1].strip()
-                    
-                if query_sql and len(query_sql) > 10:  # Ignora queries muito pequenas
-                    self.queries.append(query_sql)
+            for query_sql in iter_queries(queries_file):
+                if len(query_sql) > 10:  # Ignora queries muito pequenas
+                    if len(query_sql) <= INTERN_MAX_LEN:
+                        query_sql = sys.intern(query_sql)
+                    self.queries.append((query_sql, returns_rows(query_sql)))
                     
             self.logger.info(f"Carregadas {len(self.queries)} queries válidas")
             return len(self.queries)
@@ -102,129 +488,288 @@ class MySQLStressTest:
             self.logger.error(f"Erro ao carregar queries: {e}")
             raise
             
-    def create_connection(self) -> pymysql.Connection:
-        """Cria uma nova conexão MySQL"""
+    def create_pool(self, num_threads: int, multi_statements: bool = False) -> PooledDB:
+        """
+        Cria o pool de conexões MySQL compartilhado pelas threads
+        
+        As conexões são abertas uma vez só, antes do teste; quando uma cai, o
+        worker devolve a conexão e pega outra do pool. multi_statements habilita
+        o envio de lotes de queries (--batch-size).
+        
+        O failover automático do DBUtils fica restrito a InterfaceError: com o
+        padrão, todo OperationalError (que o pymysql usa também para erros
+        comuns do servidor, como 1054 e 1205) faria a query rodar de novo em
+        outro cursor e depois em uma conexão nova, escondido do retry (e da
+        classificação de erros) do worker_thread.
+        """
         try:
-            connection = pymysql.connect(
+            pool = PooledDB(
+                creator=pymysql,
+                mincached=num_threads,
+                maxcached=num_threads,
+                maxconnections=num_threads,
+                blocking=True,
                 host=self.config['MYSQL_HOST'],
-                port=int(self.config['MYSQL_PORT']),
+                port=self.port,
                 user=self.config['MYSQL_USER'],
                 password=self.config['MYSQL_PASSWORD'],
                 database=self.config['MYSQL_DATABASE'],
-                connect_timeout=int(self.config.get('CONNECTION_TIMEOUT', 10)),
-                read_timeout=int(self.config.get('QUERY_TIMEOUT', 30)),
-                write_timeout=int(self.config.get('QUERY_TIMEOUT', 30)),
-                charset='utf8mb4'
+                connect_timeout=self.connection_timeout,
+                read_timeout=self.query_timeout,
+                write_timeout=self.query_timeout,
+                charset='utf8mb4',
+                client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0,
+                failures=(pymysql.err.InterfaceError,)
             )
-            return connection
+            return pool
         except Exception as e:
             self.logger.error(f"Erro ao conectar no MySQL: {e}")
             raise
             
-    def execute_query(self, connection: pymysql.Connection, query: str) -> tuple:
-        """Executa uma query e retorna (sucesso, tempo_execucao, erro)"""
-        start_time = time.time()
-        
+    def checkout_connection(self) -> tuple:
+        """Pega uma conexão do pool e abre o cursor reaproveitado pelo worker"""
+        connection = self.pool.connection()
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                # Para SELECT, faz fetch dos resultados
-                if query.strip().upper().startswith('SELECT'):
-                    cursor.fetchall()
-                else:
+            return connection, connection.cursor(SSCursor)
+        except Exception:
+            close_quietly(connection)
+            raise
+            
+    def make_query_executor(self, has_rows: bool, statements: Optional[PreparedStatementCache] = None,
+                            fetch: bool = True) -> Callable:
+        """
+        Monta a função que executa uma query de um tipo (leitura ou escrita) com as
+        opções do teste já resolvidas:
+        (conexão, cursor, query) -> (sucesso, tempo_execucao_ns, erro)
+        
+        O worker monta as duas uma vez só e escolhe pelo flag da query, em vez de
+        testar o tipo, os prepared statements e o fetch a cada execução. O cursor
+        (SSCursor) é o da conexão do worker, reaproveitado entre as queries.
+        """
+        perf_counter_ns = time.perf_counter_ns
+        # Com --prepared a query passa pelo cache; sem, vai direto ao cursor (que
+        # vem do pool embrulhado, por isso não dá para usar SSCursor.execute)
+        send = statements.execute if statements is not None else send_query
+        
+        if has_rows and fetch:
+            def execute_query(connection, cursor, query):
+                start_ns = perf_counter_ns()
+                try:
+                    send(cursor, query)
+                    # Lê o resultado até o fim, deixando o cursor pronto para a próxima
+                    for _ in cursor.fetchall_unbuffered():
+                        pass
+                    return True, perf_counter_ns() - start_ns, None
+                except Exception as e:
+                    return False, perf_counter_ns() - start_ns, e
+                    
+        elif has_rows:
+            def execute_query(connection, cursor, query):
+                start_ns = perf_counter_ns()
+                try:
+                    # Sem fetch: usa um cursor só para esta query, porque é ao
+                    # fechá-lo que o pymysql descarta as linhas sem convertê-las
+                    with connection.cursor(SSCursor) as query_cursor:
+                        send(query_cursor, query)
+                    return True, perf_counter_ns() - start_ns, None
+                except Exception as e:
+                    return False, perf_counter_ns() - start_ns, e
+                    
+        else:
+            def execute_query(connection, cursor, query):
+                start_ns = perf_counter_ns()
+                try:
+                    send(cursor, query)
                     connection.commit()
+                    return True, perf_counter_ns() - start_ns, None
+                except Exception as e:
+                    return False, perf_counter_ns() - start_ns, e
                     
-            execution_time = time.time() - start_time
-            return True, execution_time, None
+        return execute_query
+        
+    def execute_batch(self, connection: pymysql.Connection, queries: List[Tuple[str, bool]]) -> tuple:
+        """
+        Executa um lote de queries em um único round-trip e retorna
+        (sucesso, tempo_execucao_ns, erro, concluidas)
+        
+        Em caso de falha, concluidas é o número de queries do início do lote que
+        valeram (as anteriores à que falhou); as demais voltam para o worker.
+        """
+        start_ns = time.perf_counter_ns()
+        done = 0
+        
+        try:
+            with connection.cursor(SSCursor) as cursor:
+                # O ';' vai em linha própria: um comentário '-- ...' ou '# ...' no
+                # fim de uma query não o engole nem junta duas queries em uma
+                cursor.execute('\n;\n'.join(query for query, _ in queries))
+                # Um resultado por query do lote, cada um lido até o fim; o erro
+                # de uma query aparece ao ler o resultado dela
+                consume_rows(cursor)
+                done += 1
+                while cursor.nextset():
+                    consume_rows(cursor)
+                    done += 1
+                    
+            # Lotes de escrita são confirmados de uma vez
+            if not queries[0][1]:
+                connection.commit()
+                
+            execution_ns = time.perf_counter_ns() - start_ns
+            return True, execution_ns, None, len(queries)
             
         except Exception as e:
-            execution_time = time.time() - start_time
-            return False, execution_time, str(e)
+            execution_ns = time.perf_counter_ns() - start_ns
+            if not queries[0][1]:
+                done = self.finish_failed_write_batch(connection, e, done)
+            return False, execution_ns, e, done
             
-    def worker_thread(self, thread_id: int, num_queries: int, duration: Optional[int] = None) -> TestResults:
-        """Função executada por cada thread worker"""
+    def finish_failed_write_batch(self, connection: pymysql.Connection, error: Exception, done: int) -> int:
+        """
+        Fecha a transação de um lote de escrita que falhou e retorna quantas
+        escritas do início do lote ficaram confirmadas
+        
+        Um erro FATAL desfaz só a query que falhou: as anteriores são confirmadas
+        e contam como bem-sucedidas. Nos demais (deadlock, timeout, conexão
+        perdida) a transação pode ter sido desfeita inteira, então tudo é
+        desfeito e o lote volta inteiro para o retry, sem repetir escritas.
+        """
+        try:
+            if done and classify_error(error) == FATAL:
+                connection.commit()
+                return done
+            connection.rollback()
+        except Exception:
+            pass  # Conexão perdida: o servidor já descartou a transação
+        return 0
+        
+    def worker_thread(self, thread_id: int, num_queries: int, duration: Optional[int] = None,
+                      prepared: bool = False, batch_size: int = 1, fetch: bool = True,
+                      shard: Optional[List[Tuple[str, bool]]] = None) -> TestResults:
+        """
+        Função executada por cada thread worker
+        
+        shard é a fatia das queries sorteadas por esta thread (por padrão,
+        todas as carregadas).
+        """
         results = TestResults(thread_id=thread_id)
         connection = None
+        cursor = None
+        statements = PreparedStatementCache() if prepared else None
+        # Executores por tipo de query, indexados pelo flag has_rows
+        executors = (self.make_query_executor(False, statements, fetch),
+                     self.make_query_executor(True, statements, fetch))
         
         try:
-            # Cria conexão própria para esta thread
-            connection = self.create_connection()
+            # Pega uma conexão do pool para esta thread
+            connection, cursor = self.checkout_connection()
             self.logger.info(f"Thread {thread_id}: Conectada ao MySQL")
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             queries_executed = 0
-            response_times = []
+            random_queries = iter_random_queries(shard or self.queries)
+            log_progress = self.logger.isEnabledFor(logging.INFO)
             
             # Executa queries por tempo determinado ou número de queries
             while True:
-                if duration and (time.time() - start_time) >= duration:
+                if duration and (time.perf_counter() - start_time) >= duration:
                     break
                 if not duration and queries_executed >= num_queries:
                     break
                     
-                # Escolhe uma query aleatória
-                query = random.choice(self.queries)
+                # Escolhe as próximas queries aleatórias; com --batch-size os
+                # SELECTs e as escritas sorteados são enviados em lotes
+                count = batch_size if duration else min(batch_size, num_queries - queries_executed)
+                queries = [next(random_queries) for _ in range(count)]
                 
-                # Executa a query com retry
-                success = False
-                for attempt in range(int(self.config.get('MAX_RETRIES', 3))):
-                    try:
-                        success, exec_time, error = self.execute_query(connection, query)
-                        
-                        if success:
-                            results.successful_queries += 1
-                            response_times.append(exec_time)
-                            break
-                        else:
-                            if attempt == int(self.config.get('MAX_RETRIES', 3)) - 1:
-                                results.failed_queries += 1
-                                results.errors.append(f"Query failed after {attempt + 1} attempts: {error}")
+                for batch in group_batches(queries):
+                    # Executa a query (ou o lote) com retry; pending são as
+                    # queries do lote que ainda não valeram
+                    pending = batch
+                    for attempt in range(self.max_retries):
+                        try:
+                            # Conexão descartada em uma tentativa anterior: pega outra
+                            # (só substitui a antiga se o pool conseguir entregá-la)
+                            if connection is None:
+                                connection, cursor = self.checkout_connection()
+                                
+                            if len(pending) == 1:
+                                query, has_rows = pending[0]
+                                success, exec_ns, error = executors[has_rows](connection, cursor, query)
+                                done = 0
+                            else:
+                                success, exec_ns, error, done = self.execute_batch(connection, pending)
+                            
+                            if success:
+                                results.add_response(exec_ns, len(pending))
+                                break
+                            if done:
+                                # As queries antes da que falhou valeram: só o resto segue
+                                results.add_response(exec_ns, done)
+                                pending = pending[done:]
+                                
+                            action = classify_error(error)
+                            if action == FATAL or attempt == self.max_retries - 1:
+                                results.failed_queries += len(pending)
+                                results.add_error(f"Query failed after {attempt + 1} attempts: {error}")
                                 self.logger.warning(f"Thread {thread_id}: Query falhou após {attempt + 1} tentativas: {error}")
+                                break
+                                
+                            if action == RECONNECT:
+                                # Conexão perdida: descarta e pega outra do pool na próxima
+                                # tentativa, em vez de insistir nela
+                                close_quietly(cursor)
+                                close_quietly(connection)
+                                connection = cursor = None
+                                if statements is not None:
+                                    statements.reset()
                             else:
-                                time.sleep(0.1)  # Pequena pausa entre tentativas
+                                time.sleep(retry_delay(attempt))
                                 
-                    except Exception as e:
-                        if attempt == int(self.config.get('MAX_RETRIES', 3)) - 1:
-                            results.failed_queries += 1
-                            results.errors.append(f"Unexpected error: {str(e)}")
-                            self.logger.error(f"Thread {thread_id}: Erro inesperado: {e}")
-                        else:
-                            time.sleep(0.1)
-                            
-                queries_executed += 1
-                results.queries_executed = queries_executed
-                
-                # Log de progresso a cada 100 queries
-                if queries_executed % 100 == 0:
-                    self.logger.info(f"Thread {thread_id}: {queries_executed} queries executadas")
+                        except Exception as e:
+                            # Falha ao reconectar (servidor fora do ar): espera antes de tentar de novo
+                            if attempt == self.max_retries - 1:
+                                results.failed_queries += len(pending)
+                                results.add_error(f"Unexpected error: {str(e)}")
+                                self.logger.error(f"Thread {thread_id}: Erro inesperado: {e}")
+                            else:
+                                time.sleep(retry_delay(attempt))
+                                
+                    queries_executed += len(batch)
+                    results.queries_executed = queries_executed
+                    
+                    # Log de progresso a cada 100 queries
+                    if log_progress and queries_executed % 100 < len(batch):
+                        self.logger.info(f"Thread {thread_id}: {queries_executed} queries executadas")
                     
             # Calcula estatísticas
-            results.total_time = time.time() - start_time
-            if response_times:
-                results.avg_response_time = sum(response_times) / len(response_times)
-                results.min_response_time = min(response_times)
-                results.max_response_time = max(response_times)
-            else:
-                results.avg_response_time = 0.0
-                results.min_response_time = 0.0
-                results.max_response_time = 0.0
+            results.finish(time.perf_counter() - start_time)
                 
             self.logger.info(f"Thread {thread_id}: Finalizada - {results.successful_queries}/{queries_executed} queries bem-sucedidas")
             
         except Exception as e:
             self.logger.error(f"Thread {thread_id}: Erro fatal: {e}")
-            results.errors.append(f"Fatal error: {str(e)}")
+            results.add_error(f"Fatal error: {str(e)}")
             
         finally:
+            if cursor:
+                close_quietly(cursor)
             if connection:
-                connection.close()
+                connection.close()  # Devolve a conexão ao pool
                 
         return results
         
-    def run_test(self, num_threads: int, queries_per_thread: int = None, duration: int = None):
+    def run_test(self, num_threads: int, queries_per_thread: int = None, duration: int = None,
+                 prepared: bool = False, batch_size: int = 1, fetch: bool = True):
         """Executa o teste de stress"""
         if not self.queries:
             raise ValueError("Nenhuma query carregada. Execute load_queries() primeiro.")
+        if batch_size < 1:
+            raise ValueError(f"batch_size deve ser >= 1 (recebido: {batch_size})")
+        if batch_size > 1 and not fetch:
+            raise ValueError("fetch=False não é suportado com batch_size > 1")
+        if batch_size > 1 and prepared:
+            raise ValueError("prepared=True não é suportado com batch_size > 1")
             
         self.logger.info(f"Iniciando teste de stress: {num_threads} threads")
         self.logger.info(f"Queries disponíveis: {len(self.queries)}")
@@ -234,8 +779,16 @@ class MySQLStressTest:
         else:
             self.logger.info(f"Queries por thread: {queries_per_thread}")
             
+        # Abre as conexões antes de iniciar a contagem do tempo
+        self.pool = self.create_pool(num_threads, multi_statements=batch_size > 1)
+        
         self.start_time = datetime.now()
         
+        # Cada thread sorteia da sua própria fatia da lista de queries, em vez de
+        # todas lerem (e mexerem nos refcounts de) uma lista compartilhada;
+        # com menos queries que threads, todas usam a lista inteira
+        shards = [self.queries[i::num_threads] or self.queries for i in range(num_threads)]
+        
         # Executa threads
         with ThreadPoolExecutor(max_workers=num_threads) as executor:
             futures = []
@@ -245,19 +798,187 @@ class MySQLStressTest:
                     self.worker_thread, 
                     i + 1, 
                     queries_per_thread or 100,
-                    duration
+                    duration,
+                    prepared,
+                    batch_size,
+                    fetch,
+                    shards[i]
                 )
                 futures.append(future)
                 
-            # Aguarda conclusão de todas as threads
-            for future in futures:
+            # Recolhe cada thread assim que termina, sem esperar pelas anteriores
+            for future in as_completed(futures):
                 try:
                     result = future.result()
                     self.results.append(result)
+                    self.logger.info(f"Thread {result.thread_id} concluída ({len(self.results)}/{num_threads})")
                 except Exception as e:
                     self.logger.error(f"Erro em thread: {e}")
                     
+        self.results.sort(key=lambda result: result.thread_id)
+        
         self.end_time = datetime.now()
+        self.pool.close()
+        self.logger.info("Teste de stress finalizado")
+        
+    async def create_connection_async(self):
+        """Cria uma conexão assíncrona (asyncmy) com as mesmas configurações do pool"""
+        try:
+            return await asyncmy.connect(
+                host=self.config['MYSQL_HOST'],
+                port=self.port,
+                user=self.config['MYSQL_USER'],
+                password=self.config['MYSQL_PASSWORD'],
+                database=self.config['MYSQL_DATABASE'],
+                connect_timeout=self.connection_timeout,
+                read_timeout=self.query_timeout,
+                charset='utf8mb4'
+            )
+        except Exception as e:
+            self.logger.error(f"Erro ao conectar no MySQL: {e}")
+            raise
+            
+    async def execute_query_async(self, connection, query: str, has_rows: bool) -> tuple:
+        """Versão assíncrona dos executores de make_query_executor: retorna (sucesso, tempo_execucao_ns, erro)"""
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute(query)
+                # Para leituras, faz fetch dos resultados
+                if has_rows:
+                    await cursor.fetchall()
+                else:
+                    await connection.commit()
+                    
+            execution_ns = time.perf_counter_ns() - start_ns
+            return True, execution_ns, None
+            
+        except Exception as e:
+            execution_ns = time.perf_counter_ns() - start_ns
+            return False, execution_ns, e
+            
+    async def worker_async(self, worker_id: int, connection, num_queries: int,
+                           duration: Optional[int] = None) -> TestResults:
+        """Versão assíncrona de worker_thread: uma corrotina por conexão"""
+        results = TestResults(thread_id=worker_id)
+        
+        try:
+            start_time = time.perf_counter()
+            queries_executed = 0
+            random_queries = iter_random_queries(self.queries)
+            log_progress = self.logger.isEnabledFor(logging.INFO)
+            
+            # Executa queries por tempo determinado ou número de queries
+            while True:
+                if duration and (time.perf_counter() - start_time) >= duration:
+                    break
+                if not duration and queries_executed >= num_queries:
+                    break
+                    
+                # Escolhe uma query aleatória
+                query, has_rows = next(random_queries)
+                
+                # Executa a query com retry
+                for attempt in range(self.max_retries):
+                    try:
+                        # Conexão descartada em uma tentativa anterior: abre outra
+                        if connection is None:
+                            connection = await self.create_connection_async()
+                            
+                        success, exec_ns, error = await self.execute_query_async(connection, query, has_rows)
+                        
+                        if success:
+                            results.add_response(exec_ns)
+                            break
+                            
+                        action = classify_error(error)
+                        if action == FATAL or attempt == self.max_retries - 1:
+                            results.failed_queries += 1
+                            results.add_error(f"Query failed after {attempt + 1} attempts: {error}")
+                            self.logger.warning(f"Worker {worker_id}: Query falhou após {attempt + 1} tentativas: {error}")
+                            break
+                            
+                        if action == RECONNECT:
+                            # Conexão perdida: descarta e abre outra na próxima tentativa
+                            close_quietly(connection)
+                            connection = None
+                        else:
+                            await asyncio.sleep(retry_delay(attempt))
+                            
+                    except Exception as e:
+                        # Falha ao reconectar (servidor fora do ar): espera antes de tentar de novo
+                        if attempt == self.max_retries - 1:
+                            results.failed_queries += 1
+                            results.add_error(f"Unexpected error: {str(e)}")
+                            self.logger.error(f"Worker {worker_id}: Erro inesperado: {e}")
+                        else:
+                            await asyncio.sleep(retry_delay(attempt))
+                            
+                queries_executed += 1
+                results.queries_executed = queries_executed
+                
+                # Log de progresso a cada 100 queries
+                if log_progress and queries_executed % 100 == 0:
+                    self.logger.info(f"Worker {worker_id}: {queries_executed} queries executadas")
+                    
+            # Calcula estatísticas
+            results.finish(time.perf_counter() - start_time)
+                
+            self.logger.info(f"Worker {worker_id}: Finalizado - {results.successful_queries}/{queries_executed} queries bem-sucedidas")
+            
+        except Exception as e:
+            self.logger.error(f"Worker {worker_id}: Erro fatal: {e}")
+            results.add_error(f"Fatal error: {str(e)}")
+            
+        finally:
+            if connection is not None:
+                await connection.ensure_closed()
+            
+        return results
+        
+    async def run_workers_async(self, num_workers: int, queries_per_worker: int, duration: Optional[int]):
+        """Abre as conexões e executa as corrotinas em um único event loop"""
+        # Abre as conexões antes de iniciar a contagem do tempo
+        connections = await asyncio.gather(*(self.create_connection_async() for _ in range(num_workers)))
+        
+        self.start_time = datetime.now()
+        
+        outcomes = await asyncio.gather(
+            *(self.worker_async(i + 1, connection, queries_per_worker, duration)
+              for i, connection in enumerate(connections)),
+            return_exceptions=True
+        )
+        
+        self.end_time = datetime.now()
+        
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                self.logger.error(f"Erro em worker: {outcome}")
+            else:
+                self.results.append(outcome)
+                
+    def run_test_async(self, num_workers: int, queries_per_thread: int = None, duration: int = None):
+        """
+        Executa o teste de stress com asyncmy: uma corrotina por conexão em vez
+        de uma thread, todas no mesmo event loop
+        """
+        if not self.queries:
+            raise ValueError("Nenhuma query carregada. Execute load_queries() primeiro.")
+            
+        self.logger.info(f"Iniciando teste de stress (asyncio): {num_workers} conexões")
+        self.logger.info(f"Queries disponíveis: {len(self.queries)}")
+        
+        if duration:
+            self.logger.info(f"Duração do teste: {duration} segundos")
+        else:
+            self.logger.info(f"Queries por conexão: {queries_per_thread}")
+            
+        workers = self.run_workers_async(num_workers, queries_per_thread or 100, duration)
+        if UVLOOP_AVAILABLE:
+            uvloop.run(workers)
+        else:
+            asyncio.run(workers)
         self.logger.info("Teste de stress finalizado")
         
     def generate_report(self) -> str:
@@ -279,13 +1000,24 @@ class MySQLStressTest:
         all_max_times = [r.max_response_time for r in self.results if r.max_response_time > 0]
         overall_max_time = max(all_max_times) if all_max_times else 0
         
+        # Percentis do teste todo: soma os histogramas das threads
+        histogram = array('q', [0]) * LATENCY_BUCKETS
+        for result in self.results:
+            for index, count in enumerate(result.latency_histogram):
+                if count:
+                    histogram[index] += count
+        p50, p95, p99 = latency_percentiles(histogram, [50, 95, 99])
+        
         queries_per_second = total_queries / total_duration if total_duration > 0 else 0
         success_rate = (total_successful / total_queries * 100) if total_queries > 0 else 0
         
-        report = f"""
-{Fore.CYAN}{'='*80}{Style.RESET_ALL}
+        # O relatório é escrito em um buffer: concatenar com += copiaria o texto
+        # inteiro a cada thread/erro adicionado
+        report = io.StringIO()
+        report.write(f"""
+{REPORT_SEPARATOR}
 {Fore.YELLOW}{Style.BRIGHT}RELATÓRIO DO TESTE DE STRESS - MySQL{Style.RESET_ALL}
-{Fore.CYAN}{'='*80}{Style.RESET_ALL}
+{REPORT_SEPARATOR}
 
 {Fore.GREEN}📊 RESUMO GERAL{Style.RESET_ALL}
 {Fore.WHITE}Início do teste:{Style.RESET_ALL}        {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}
@@ -304,48 +1036,60 @@ class MySQLStressTest:
 {Fore.WHITE}Tempo médio:{Style.RESET_ALL}           {overall_avg_time:.4f}s
 {Fore.GREEN}Tempo mínimo:{Style.RESET_ALL}          {overall_min_time:.4f}s
 {Fore.RED}Tempo máximo:{Style.RESET_ALL}          {overall_max_time:.4f}s
+{Fore.WHITE}Mediana (p50):{Style.RESET_ALL}         {p50:.4f}s
+{Fore.YELLOW}Percentil 95:{Style.RESET_ALL}          {p95:.4f}s
+{Fore.RED}Percentil 99:{Style.RESET_ALL}          {p99:.4f}s
 
 {Fore.GREEN}📈 DETALHES POR THREAD{Style.RESET_ALL}
-"""
+""")
         
         for result in self.results:
             qps = result.successful_queries / result.total_time if result.total_time > 0 else 0
             thread_success_rate = (result.successful_queries / result.queries_executed * 100) if result.queries_executed > 0 else 0
             
-            report += f"""
-{Fore.CYAN}Thread {result.thread_id}:{Style.RESET_ALL}
-  Queries executadas: {result.queries_executed}
-  Bem-sucedidas: {Fore.GREEN}{result.successful_queries}{Style.RESET_ALL}
-  Com falha: {Fore.RED}{result.failed_queries}{Style.RESET_ALL}
-  Taxa de sucesso: {thread_success_rate:.1f}%
-  Tempo total: {result.total_time:.2f}s
-  Queries/seg: {qps:.2f}
-  Tempo médio: {result.avg_response_time:.4f}s
-  Tempo mín: {result.min_response_time:.4f}s
-  Tempo máx: {result.max_response_time:.4f}s"""
-            
-            if result.errors:
-                report += f"\n  {Fore.RED}Erros: {len(result.errors)}{Style.RESET_ALL}"
+            report.write(THREAD_REPORT_TEMPLATE.format(
+                thread_id=result.thread_id,
+                queries_executed=result.queries_executed,
+                successful_queries=result.successful_queries,
+                failed_queries=result.failed_queries,
+                success_rate=thread_success_rate,
+                total_time=result.total_time,
+                qps=qps,
+                avg_response_time=result.avg_response_time,
+                min_response_time=result.min_response_time,
+                max_response_time=result.max_response_time
+            ))
+            
+            if result.error_count:
+                report.write(THREAD_ERRORS_TEMPLATE.format(error_count=result.error_count))
                 
         # Adiciona erros detalhados se houver
         all_errors = []
         for result in self.results:
             all_errors.extend(result.errors)
+        total_errors = sum(r.error_count for r in self.results)
             
         if all_errors:
-            report += f"""\n
-{Fore.RED}🚨 ERROS ENCONTRADOS ({len(all_errors)} total){Style.RESET_ALL}
-"""
+            report.write(f"""\n
+{Fore.RED}🚨 ERROS ENCONTRADOS ({total_errors} total){Style.RESET_ALL}
+""")
             for i, error in enumerate(all_errors[:10]):  # Mostra apenas primeiros 10 erros
-                report += f"  {i+1}. {error}\n"
+                report.write(f"  {i+1}. {error}\n")
                 
-            if len(all_errors) > 10:
-                report += f"  ... e mais {len(all_errors) - 10} erros\n"
+            if total_errors > 10:
+                report.write(f"  ... e mais {total_errors - 10} erros\n")
                 
-        report += f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n"
+        report.write(f"\n{REPORT_SEPARATOR}\n")
         
-        return report
+        return report.getvalue()
+
 
+def positive_int(value: str) -> int:
+    """Tipo do argparse para opções que precisam ser um inteiro >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"deve ser um inteiro >= 1: {value}")
+    return number
 
 def load_config() -> dict:
     """Carrega configurações do arquivo .env"""
@@ -389,9 +1133,34 @@ def main():
                        help='Máximo de queries para extrair do log (padrão: 5000)')
     parser.add_argument('--query-type', choices=['read', 'write'],
                        help='Filtrar queries por tipo ao extrair (read=SELECT, write=INSERT/UPDATE/DELETE)')
+    parser.add_argument('--prepared', action='store_true',
+                       help='Executa as queries como prepared statements (PREPARE uma vez, EXECUTE nas seguintes)')
+    parser.add_argument('--batch-size', type=positive_int, default=1,
+                       help='Sorteia N queries por vez e envia os SELECTs e as escritas em lotes, um round-trip cada (padrão: 1; não combina com --prepared nem --no-fetch)')
+    parser.add_argument('--no-fetch', action='store_true',
+                       help='Não lê as linhas dos SELECTs no cliente (mede só o custo do servidor; não combina com --batch-size)')
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                       help='Usa asyncio + asyncmy (uma corrotina por conexão) em vez de threads')
     
     args = parser.parse_args()
     
+    if args.async_mode:
+        if not ASYNCMY_AVAILABLE:
+            print(f"{Fore.RED}Erro: --async requer o pacote asyncmy (pip install asyncmy){Style.RESET_ALL}")
+            sys.exit(1)
+        if args.prepared or args.batch_size > 1 or args.no_fetch:
+            print(f"{Fore.RED}Erro: --prepared, --batch-size e --no-fetch não são suportados com --async{Style.RESET_ALL}")
+            sys.exit(1)
+            
+    # Os lotes vão como texto em um único round-trip, sem passar pelos prepared statements
+    if args.prepared and args.batch_size > 1:
+        print(f"{Fore.RED}Erro: --prepared não pode ser usado com --batch-size maior que 1{Style.RESET_ALL}")
+        sys.exit(1)
+    # Em um lote cada resultado precisa ser lido até o fim para chegar ao próximo
+    if args.no_fetch and args.batch_size > 1:
+        print(f"{Fore.RED}Erro: --no-fetch não pode ser usado com --batch-size maior que 1{Style.RESET_ALL}")
+        sys.exit(1)
+    
     try:
         # Carrega configurações
         print(f"{Fore.YELLOW}Carregando configurações...{Style.RESET_ALL}")
@@ -431,7 +1200,11 @@ def main():
             print(f"{Fore.WHITE}Queries por thread: {queries_per_thread}{Style.RESET_ALL}")
             
         # Executa teste
-        stress_test.run_test(args.threads, queries_per_thread, duration)
+        if args.async_mode:
+            stress_test.run_test_async(args.threads, queries_per_thread, duration)
+        else:
+            stress_test.run_test(args.threads, queries_per_thread, duration, args.prepared, args.batch_size,
+                                 not args.no_fetch)
         
         # Gera e exibe relatório
         report = stress_test.generate_report()
@@ -441,7 +1214,6 @@ def main():
         report_file = f"stress_test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         with open(report_file, 'w', encoding='utf-8') as f:
             # Remove códigos de cor para o arquivo
-            import re
             clean_report = re.sub(r'\033\[[0-9;]*m', '', report)
             f.write(clean_report)
             
@@ -5,7 +5,7 @@ Compara estatísticas antes e depois da implementação do filtro
 """
 import re
 import sys
-from extract_queries import is_system_query, get_query_type, should_ignore_query
+from extract_queries import is_system_query, get_query_type, should_ignore_query, READ, WRITE
 
 def analyze_log_sample(log_file, max_lines=5000):
     """
@@ -23,19 +23,16 @@ def analyze_log_sample(log_file, max_lines=5000):
     }
     
     # Padrões para identificar queries
-    query_start_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z\s+\d+\s+Query\s+(.+)')
-    ignore_patterns = [
-        re.compile(r'SET SESSION sql_mode', re.IGNORECASE),
-        re.compile(r'SET NAMES', re.IGNORECASE),
-        re.compile(r'SET @@', re.IGNORECASE),
-    ]
+    query_start_pattern = re.compile(rb'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z\s+\d+\s+Query\s+(.+)')
+    ignore_pattern = re.compile(rb'(?:SET SESSION sql_mode|SET NAMES|SET @@)', re.IGNORECASE)
     
-    current_query = ""
+    current_parts = []
     in_query = False
     
     print("🔍 Analisando amostra do log...")
     
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+    # Lê em bytes: as funções de classificação do extrator trabalham sobre bytes
+    with open(log_file, 'rb', buffering=1 << 20) as f:
         for line_num, line in enumerate(f, 1):
             stats['total_lines'] += 1
             if line_num > max_lines:
@@ -49,29 +46,29 @@ def analyze_log_sample(log_file, max_lines=5000):
             match = query_start_pattern.match(line)
             if match:
                 # Processa query anterior se existir
-                if in_query and current_query.strip():
-                    process_query(current_query.strip(), stats, ignore_patterns)
+                if in_query:
+                    process_query(b"\n".join(current_parts).strip(), stats, ignore_pattern)
                 
                 # Inicia nova query
-                current_query = match.group(1)
+                current_parts = [match.group(1)]
                 in_query = True
                 stats['query_lines'] += 1
             elif in_query:
-                # Linha de continuação
-                current_query += "\n" + line
+                # Linha de continuação (juntada uma vez só, no fim da query)
+                current_parts.append(line)
         
         # Processa última query
-        if in_query and current_query.strip():
-            process_query(current_query.strip(), stats, ignore_patterns)
+        if in_query:
+            process_query(b"\n".join(current_parts).strip(), stats, ignore_pattern)
     
     print(f"✅ Análise concluída ({stats['total_lines']} linhas processadas)")
     return stats
 
-def process_query(query, stats, ignore_patterns):
+def process_query(query, stats, ignore_pattern):
     """
     Processa uma query individual e atualiza estatísticas
     """
-    if should_ignore_query(query, ignore_patterns):
+    if should_ignore_query(query, ignore_pattern):
         stats['ignored_queries'] += 1
         return
     
@@ -80,9 +77,9 @@ def process_query(query, stats, ignore_patterns):
     else:
         stats['app_queries'] += 1
         query_type = get_query_type(query)
-        if query_type == 'read':
+        if query_type == READ:
             stats['read_queries'] += 1
-        elif query_type == 'write':
+        elif query_type == WRITE:
             stats['write_queries'] += 1
 
 def print_comparison_report(stats):